@@ -1,22 +1,18 @@
-from flask import Flask, jsonify, request
+from flask import Blueprint, Flask, jsonify, request
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 import os
-import requests
+import sys
 
-app = Flask(__name__)
-CORS(app)
-
-# Configuration
 basedir = os.path.abspath(os.path.dirname(__file__))
-app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL') or \
-    'sqlite:///' + os.path.join(basedir, 'data', 'cart.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 # Service URLs
 PRODUCT_SERVICE_URL = os.environ.get('PRODUCT_SERVICE_URL') or 'http://localhost:5001'
 
-db = SQLAlchemy(app)
+# Extensions are bound to an app in create_app(); nothing touches the
+# database at import time, so gunicorn workers start without I/O.
+db = SQLAlchemy()
+bp = Blueprint('cart', __name__)
 
 # Models
 class CartItem(db.Model):
@@ -35,13 +31,14 @@ class CartItem(db.Model):
             'addedAt': self.added_at.isoformat() if self.added_at else None
         }
 
-# Initialize database
-with app.app_context():
+# Database setup (run once per release via `flask --app app init-db`)
+def init_db():
     db.create_all()
 
 # Helper functions
 def get_product_details(product_id):
     try:
+        import requests
         response = requests.get(f'{PRODUCT_SERVICE_URL}/products/{product_id}')
         if response.status_code == 200:
             return response.json()
@@ -50,11 +47,11 @@ def get_product_details(product_id):
         return None
 
 # Routes
-@app.route('/health', methods=['GET'])
+@bp.route('/health', methods=['GET'])
 def health():
     return jsonify({'status': 'healthy', 'service': 'cart-service'})
 
-@app.route('/cart/<user_id>', methods=['GET'])
+@bp.route('/cart/<user_id>', methods=['GET'])
 def get_cart(user_id):
     try:
         cart_items = CartItem.query.filter_by(user_id=user_id).all()
@@ -86,7 +83,7 @@ def get_cart(user_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/cart/<user_id>/add', methods=['POST'])
+@bp.route('/cart/<user_id>/add', methods=['POST'])
 def add_to_cart(user_id):
     try:
         data = request.get_json()
@@ -125,7 +122,7 @@ def add_to_cart(user_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/cart/<user_id>/update', methods=['PUT'])
+@bp.route('/cart/<user_id>/update', methods=['PUT'])
 def update_cart_item(user_id):
     try:
         data = request.get_json()
@@ -153,7 +150,7 @@ def update_cart_item(user_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/cart/<user_id>/remove/<int:item_id>', methods=['DELETE'])
+@bp.route('/cart/<user_id>/remove/<int:item_id>', methods=['DELETE'])
 def remove_from_cart(user_id, item_id):
     try:
         item = CartItem.query.filter_by(
@@ -172,7 +169,7 @@ def remove_from_cart(user_id, item_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/cart/<user_id>/clear', methods=['DELETE'])
+@bp.route('/cart/<user_id>/clear', methods=['DELETE'])
 def clear_cart(user_id):
     try:
         CartItem.query.filter_by(user_id=user_id).delete()
@@ -183,5 +180,30 @@ def clear_cart(user_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def create_app():
+    app = Flask(__name__)
+    CORS(app)
+
+    # Database configuration
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL') or \
+        'sqlite:///' + os.path.join(basedir, 'data', 'cart.db')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    db.init_app(app)
+    app.register_blueprint(bp)
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create database tables."""
+        init_db()
+
+    return app
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5003, debug=True)
\ No newline at end of file
+    app = create_app()
+    # Schema setup is a separate step: `python app.py init-db` runs only that
+    if sys.argv[1:] == ['init-db']:
+        with app.app_context():
+            init_db()
+    else:
+        app.run(host='0.0.0.0', port=5003, debug=True)
\ No newline at end of file
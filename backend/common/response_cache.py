@@ -0,0 +1,292 @@
+"""Per-route HTTP response caching with stale-while-revalidate.
+
+Usage:
+    cache = ResponseCache()
+
+    @bp.route('/categories', methods=['GET'])
+    @cache.cached(max_age=300, stale_while_revalidate=600, tag='catalog')
+    def get_categories(): ...
+
+    cache.init_app(app)
+    cache.invalidate('catalog')  # after a write
+
+Fresh entries are served directly, stale ones are served immediately while
+a worker thread recomputes them, and only expired entries are computed on
+the request path. Entries live in process memory (LRU) or, when REDIS_HOST
+is set, in Redis so all pods share them. Hit/miss/eviction counters are
+exported in Prometheus text format at /metrics.
+
+Invalidation bumps a per-tag generation number that is part of every cache
+key, so it costs one write however many entries the tag covers; entries of
+older generations are never read again and simply age out. In memory the
+generations are per process, so a write only invalidates the gunicorn worker
+that handled it; memory entries are therefore fresh for at most
+RESPONSE_CACHE_MEMORY_MAX_AGE seconds (default 5) and served stale for at
+most as long again, whatever the route's policy. Run with REDIS_HOST
+whenever there is more than one worker or pod.
+
+Shared by the backend services; images are built from backend/ and copy
+this file next to app.py.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from functools import wraps
+import base64
+import json
+import os
+import threading
+import time
+
+from flask import Response, current_app, request
+
+class MemoryBackend:
+    scope = 'process'
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.generations = {}
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def set(self, key, entry, ttl):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def generation(self, tag):
+        with self.lock:
+            return self.generations.get(tag, 0)
+
+    def bump(self, tag):
+        with self.lock:
+            self.generations[tag] = self.generations.get(tag, 0) + 1
+
+    def stats(self):
+        return {'entries': len(self.entries), 'evictions': self.evictions}
+
+class RedisBackend:
+    # Redis errors degrade to cache misses; the cache must never fail a request
+    scope = 'redis-instance'
+
+    def __init__(self, host, port, password, namespace):
+        import redis
+        self.client = redis.Redis(host=host, port=port, password=password,
+                                  socket_timeout=0.5, socket_connect_timeout=0.5)
+        self.namespace = namespace
+
+    def get(self, key):
+        # A corrupt or foreign entry is a miss and gets overwritten
+        try:
+            raw = self.client.get(self.namespace + key)
+            if raw is None:
+                return None
+            entry = json.loads(raw)
+            entry['body'] = base64.b64decode(entry['body'])
+            return entry
+        except Exception:
+            return None
+
+    def set(self, key, entry, ttl):
+        payload = dict(entry, body=base64.b64encode(entry['body']).decode('ascii'))
+        try:
+            self.client.set(self.namespace + key, json.dumps(payload), ex=max(int(ttl), 1))
+        except Exception:
+            pass
+
+    def generation(self, tag):
+        try:
+            return int(self.client.get(f'{self.namespace}gen:{tag}') or 0)
+        except Exception:
+            return 0
+
+    def bump(self, tag):
+        try:
+            self.client.incr(f'{self.namespace}gen:{tag}')
+        except Exception:
+            pass
+
+    def stats(self):
+        # Redis only reports these for the whole instance, not per namespace
+        try:
+            info = self.client.info('stats')
+            return {'entries': self.client.dbsize(), 'evictions': info.get('evicted_keys', 0)}
+        except Exception:
+            return {'entries': 0, 'evictions': 0}
+
+class ResponseCache:
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.config.setdefault('RESPONSE_CACHE_MAX_ENTRIES', int(os.environ.get('RESPONSE_CACHE_MAX_ENTRIES') or 1024))
+        app.config.setdefault('RESPONSE_CACHE_WORKERS', int(os.environ.get('RESPONSE_CACHE_WORKERS') or 2))
+        app.config.setdefault('RESPONSE_CACHE_MEMORY_MAX_AGE', int(os.environ.get('RESPONSE_CACHE_MEMORY_MAX_AGE') or 5))
+        app.config.setdefault('SERVICE_NAME', os.environ.get('SERVICE_NAME') or app.import_name)
+        app.config.setdefault('REDIS_HOST', os.environ.get('REDIS_HOST'))
+        app.config.setdefault('REDIS_PORT', int(os.environ.get('REDIS_PORT') or 6379))
+        app.config.setdefault('REDIS_PASSWORD', os.environ.get('REDIS_PASSWORD') or None)
+
+        if app.config['REDIS_HOST']:
+            backend = RedisBackend(app.config['REDIS_HOST'], app.config['REDIS_PORT'], app.config['REDIS_PASSWORD'],
+                                   f"response-cache:{app.config['SERVICE_NAME']}:")
+            max_lifetime = None
+        else:
+            backend = MemoryBackend(app.config['RESPONSE_CACHE_MAX_ENTRIES'])
+            # Other workers never see this process's invalidations
+            max_lifetime = app.config['RESPONSE_CACHE_MEMORY_MAX_AGE']
+
+        app.extensions['response_cache'] = {
+            'backend': backend,
+            'max_lifetime': max_lifetime,
+            'counters': {},
+            'executor': None,
+            'refreshing': set(),
+            'lock': threading.Lock(),
+        }
+        app.add_url_rule('/metrics', 'response_cache_metrics', self.metrics)
+
+    def cached(self, max_age, stale_while_revalidate=0, vary=(), private=False, tag=None):
+        """Cache 200 GET responses for max_age seconds, then serve them stale for stale_while_revalidate more.
+
+        tag names the invalidation group and may use the view's URL
+        arguments, e.g. 'order:{order_id}'; it defaults to the view name.
+        """
+        def decorator(view):
+            policy = {'max_age': max_age, 'stale_while_revalidate': stale_while_revalidate,
+                      'vary': tuple(vary), 'private': private, 'tag': tag or view.__name__}
+
+            @wraps(view)
+            def wrapper(*args, **kwargs):
+                if request.method != 'GET':
+                    return view(*args, **kwargs)
+
+                state = current_app.extensions['response_cache']
+                entry_tag = policy['tag'].format(**kwargs)
+                generation = state['backend'].generation(entry_tag)
+                key = self._key(policy, entry_tag, generation)
+                entry = state['backend'].get(key)
+                age = time.time() - entry['stored_at'] if entry else None
+                fresh_for, stale_for = max_age, stale_while_revalidate
+                if state['max_lifetime'] is not None:
+                    fresh_for = min(fresh_for, state['max_lifetime'])
+                    stale_for = min(stale_for, state['max_lifetime'])
+
+                if entry and age < fresh_for:
+                    outcome = 'hit'
+                elif entry and age < fresh_for + stale_for:
+                    outcome = 'stale'
+                    self._schedule_refresh(state, key, entry_tag, generation, policy, view, args, kwargs)
+                else:
+                    outcome = 'miss'
+                    response = current_app.make_response(view(*args, **kwargs))
+                    entry = self._store(state, key, policy, response)
+                    if entry is None:
+                        # Errors and streamed bodies are passed through uncached
+                        self._count(state, view.__name__, outcome)
+                        return response
+                    age = 0
+
+                self._count(state, view.__name__, outcome)
+                return self._build_response(entry, policy, age, outcome)
+            return wrapper
+        return decorator
+
+    def invalidate(self, *tags):
+        """Drop every cached response under the given tags."""
+        backend = current_app.extensions['response_cache']['backend']
+        for tag in tags:
+            backend.bump(tag)
+
+    def metrics(self):
+        state = current_app.extensions['response_cache']
+        backend = state['backend']
+        service = current_app.config['SERVICE_NAME']
+        lines = []
+        for (endpoint, outcome), value in sorted(state['counters'].items()):
+            lines.append(f'response_cache_requests_total{{service="{service}",endpoint="{endpoint}",outcome="{outcome}"}} {value}')
+        stats = backend.stats()
+        lines.append(f'response_cache_entries{{service="{service}",scope="{backend.scope}"}} {stats["entries"]}')
+        lines.append(f'response_cache_evictions_total{{service="{service}",scope="{backend.scope}"}} {stats["evictions"]}')
+        return Response('\n'.join(lines) + '\n', mimetype='text/plain; version=0.0.4')
+
+    def _key(self, policy, tag, generation):
+        key = f'{tag}@{generation}|{request.path}'
+        if request.query_string:
+            key += '?' + '&'.join(sorted(request.query_string.decode('utf-8', 'replace').split('&')))
+        for header in policy['vary']:
+            key += f'|{header}={request.headers.get(header, "")}'
+        return key
+
+    def _store(self, state, key, policy, response):
+        if response.status_code != 200 or response.is_streamed:
+            return None
+        entry = {
+            'stored_at': time.time(),
+            'status': response.status_code,
+            'mimetype': response.mimetype,
+            'body': response.get_data(),
+        }
+        state['backend'].set(key, entry, policy['max_age'] + policy['stale_while_revalidate'])
+        return entry
+
+    def _build_response(self, entry, policy, age, outcome):
+        response = Response(entry['body'], status=entry['status'], mimetype=entry['mimetype'])
+        directives = ['private' if policy['private'] else 'public', f'max-age={policy["max_age"]}']
+        if policy['stale_while_revalidate']:
+            directives.append(f'stale-while-revalidate={policy["stale_while_revalidate"]}')
+        response.headers['Cache-Control'] = ', '.join(directives)
+        # Compressing proxies in front of us (nginx, CDN) key on encoding too
+        response.vary.add('Accept-Encoding')
+        for header in policy['vary']:
+            response.vary.add(header)
+        response.headers['Age'] = str(int(age))
+        response.headers['X-Cache'] = outcome.upper()
+        return response
+
+    def _schedule_refresh(self, state, key, tag, generation, policy, view, args, kwargs):
+        with state['lock']:
+            if key in state['refreshing']:
+                return
+            state['refreshing'].add(key)
+            # Created on first use so each gunicorn worker owns its own threads
+            if state['executor'] is None:
+                state['executor'] = ThreadPoolExecutor(
+                    max_workers=current_app.config['RESPONSE_CACHE_WORKERS'],
+                    thread_name_prefix='response-cache')
+        app = current_app._get_current_object()
+        headers = {header: request.headers[header] for header in policy['vary'] if header in request.headers}
+        state['executor'].submit(self._refresh, app, state, key, tag, generation, policy, view, args, kwargs,
+                                 request.path, request.query_string, headers)
+
+    def _refresh(self, app, state, key, tag, generation, policy, view, args, kwargs, path, query_string, headers):
+        try:
+            with app.test_request_context(path, query_string=query_string, headers=headers):
+                response = app.make_response(view(*args, **kwargs))
+                # A write invalidated the tag while we were computing: the
+                # result may predate it, so drop it rather than store it
+                if state['backend'].generation(tag) != generation:
+                    return
+                if self._store(state, key, policy, response) is not None:
+                    self._count(state, view.__name__, 'refresh')
+        except Exception:
+            app.logger.exception('Background refresh of %s failed', key)
+        finally:
+            with state['lock']:
+                state['refreshing'].discard(key)
+
+    def _count(self, state, endpoint, outcome):
+        with state['lock']:
+            counter = (endpoint, outcome)
+            state['counters'][counter] = state['counters'].get(counter, 0) + 1
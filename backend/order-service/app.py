@@ -1,25 +1,27 @@
-from flask import Flask, jsonify, request
+from flask import Blueprint, Flask, jsonify, request
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 import os
-import requests
+import sys
 import uuid
 from datetime import datetime
 
-app = Flask(__name__)
-CORS(app)
+from response_cache import ResponseCache
 
-# Configuration
 basedir = os.path.abspath(os.path.dirname(__file__))
-app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL') or \
-    'sqlite:///' + os.path.join(basedir, 'data', 'orders.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
 # Service URLs
 CART_SERVICE_URL = os.environ.get('CART_SERVICE_URL') or 'http://localhost:5003'
 USER_SERVICE_URL = os.environ.get('USER_SERVICE_URL') or 'http://localhost:5002'
+PRODUCT_SERVICE_URL = os.environ.get('PRODUCT_SERVICE_URL') or 'http://localhost:5001'
+# Shared with product-service, which only accepts sales feeds carrying it
+ADMIN_API_TOKEN = os.environ.get('ADMIN_API_TOKEN') or ''
 
-db = SQLAlchemy(app)
+# Extensions are bound to an app in create_app(); nothing touches the
+# database at import time, so gunicorn workers start without I/O.
+db = SQLAlchemy()
+bp = Blueprint('orders', __name__)
+cache = ResponseCache()
 
 # Models
 class Order(db.Model):
@@ -64,13 +66,14 @@ class OrderItem(db.Model):
             'itemTotal': self.item_total
         }
 
-# Initialize database
-with app.app_context():
+# Database setup (run once per release via `flask --app app init-db`)
+def init_db():
     db.create_all()
 
 # Helper functions
 def get_cart_details(user_id):
     try:
+        import requests
         response = requests.get(f'{CART_SERVICE_URL}/cart/{user_id}')
         if response.status_code == 200:
             return response.json()
@@ -80,16 +83,26 @@ def get_cart_details(user_id):
 
 def clear_user_cart(user_id):
     try:
+        import requests
         requests.delete(f'{CART_SERVICE_URL}/cart/{user_id}/clear')
     except:
         pass
 
+def report_product_sales(items):
+    # Feeds product-service's trending rankings; an order never fails on this
+    try:
+        import requests
+        requests.post(f'{PRODUCT_SERVICE_URL}/products/sales', json={'items': items},
+                      headers={'X-Admin-Token': ADMIN_API_TOKEN}, timeout=2)
+    except:
+        pass
+
 # Routes
-@app.route('/health', methods=['GET'])
+@bp.route('/health', methods=['GET'])
 def health():
     return jsonify({'status': 'healthy', 'service': 'order-service'})
 
-@app.route('/orders', methods=['POST'])
+@bp.route('/orders', methods=['POST'])
 def create_order():
     try:
         data = request.get_json()
@@ -135,6 +148,10 @@ def create_order():
         
         # Clear cart after successful order
         clear_user_cart(user_id)
+        report_product_sales([
+            {'productId': item['product']['id'], 'quantity': item['quantity']}
+            for item in cart['items']
+        ])
         
         return jsonify({
             'message': 'Order created successfully',
@@ -144,7 +161,7 @@ def create_order():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/orders/<user_id>', methods=['GET'])
+@bp.route('/orders/<user_id>', methods=['GET'])
 def get_user_orders(user_id):
     try:
         orders = Order.query.filter_by(user_id=user_id).order_by(Order.created_at.desc()).all()
@@ -161,7 +178,8 @@ def get_user_orders(user_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/orders/detail/<order_id>', methods=['GET'])
+@bp.route('/orders/detail/<order_id>', methods=['GET'])
+@cache.cached(max_age=15, stale_while_revalidate=60, private=True, tag='order:{order_id}')
 def get_order_details(order_id):
     try:
         order = Order.query.get(order_id)
@@ -178,7 +196,7 @@ def get_order_details(order_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/orders/<order_id>/status', methods=['PUT'])
+@bp.route('/orders/<order_id>/status', methods=['PUT'])
 def update_order_status(order_id):
     try:
         data = request.get_json()
@@ -193,6 +211,7 @@ def update_order_status(order_id):
         order.status = data['status']
         order.updated_at = datetime.utcnow()
         db.session.commit()
+        cache.invalidate(f'order:{order_id}')
         
         return jsonify({
             'message': 'Order status updated successfully',
@@ -202,5 +221,32 @@ def update_order_status(order_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def create_app():
+    app = Flask(__name__)
+    CORS(app)
+
+    # Database configuration
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL') or \
+        'sqlite:///' + os.path.join(basedir, 'data', 'orders.db')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SERVICE_NAME'] = os.environ.get('SERVICE_NAME') or 'order-service'
+
+    db.init_app(app)
+    cache.init_app(app)
+    app.register_blueprint(bp)
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create database tables."""
+        init_db()
+
+    return app
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5004, debug=True)
\ No newline at end of file
+    app = create_app()
+    # Schema setup is a separate step: `python app.py init-db` runs only that
+    if sys.argv[1:] == ['init-db']:
+        with app.app_context():
+            init_db()
+    else:
+        app.run(host='0.0.0.0', port=5004, debug=True)
\ No newline at end of file
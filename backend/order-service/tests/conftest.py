@@ -0,0 +1,28 @@
+import os
+import sys
+
+import pytest
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+sys.path.insert(0, os.path.join(os.path.dirname(SERVICE_DIR), 'common'))
+
+import app as order_app
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', 'sqlite:///' + str(tmp_path / 'orders.db'))
+    monkeypatch.delenv('REDIS_HOST', raising=False)
+    # Exercise the routes' own cache windows; the memory-tier cap has its own test
+    monkeypatch.setenv('RESPONSE_CACHE_MEMORY_MAX_AGE', '86400')
+    app = order_app.create_app()
+    app.config['TESTING'] = True
+    with app.app_context():
+        order_app.init_db()
+        order_app.db.session.add(order_app.Order(id='o-1', user_id='u-1', total_amount=499, status='pending'))
+        order_app.db.session.commit()
+    yield app
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
@@ -0,0 +1,43 @@
+import response_cache
+
+def test_order_detail_is_cached_privately(client):
+    first = client.get('/orders/detail/o-1')
+    assert first.headers['X-Cache'] == 'MISS'
+    assert first.headers['Cache-Control'] == 'private, max-age=15, stale-while-revalidate=60'
+    assert client.get('/orders/detail/o-1').headers['X-Cache'] == 'HIT'
+
+def test_status_update_invalidates_only_that_order(app, client):
+    client.get('/orders/detail/o-1')
+    client.get('/orders/detail/missing')
+
+    response = client.put('/orders/o-1/status', json={'status': 'shipped'})
+    assert response.status_code == 200
+
+    detail = client.get('/orders/detail/o-1')
+    assert detail.headers['X-Cache'] == 'MISS'
+    assert detail.json['status'] == 'shipped'
+
+def test_stale_order_is_refreshed_in_background(app, client):
+    client.get('/orders/detail/o-1')
+    state = app.extensions['response_cache']
+    for entry in state['backend'].entries.values():
+        entry['stored_at'] -= 16
+
+    assert client.get('/orders/detail/o-1').headers['X-Cache'] == 'STALE'
+    state['executor'].shutdown(wait=True)
+    assert state['counters'][('get_order_details', 'refresh')] == 1
+    assert client.get('/orders/detail/o-1').headers['X-Cache'] == 'HIT'
+
+def test_memory_backend_evicts_least_recently_used():
+    backend = response_cache.MemoryBackend(max_entries=2)
+    backend.set('a', {'n': 1}, 10)
+    backend.set('b', {'n': 2}, 10)
+    backend.get('a')
+    backend.set('c', {'n': 3}, 10)
+    assert backend.get('b') is None
+    assert backend.get('a') == {'n': 1}
+    assert backend.stats() == {'entries': 2, 'evictions': 1}
+
+def test_metrics_use_service_name(client):
+    client.get('/orders/detail/o-1')
+    assert 'service="order-service"' in client.get('/metrics').get_data(as_text=True)
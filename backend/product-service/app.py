@@ -1,18 +1,37 @@
-from flask import Flask, jsonify, request
+from flask import Blueprint, Flask, Response, current_app, jsonify, request, stream_with_context
+from functools import wraps
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
+import click
+import csv
+import hmac
+import io
+import json
+import math
 import os
+import sys
+import time
+import zlib
 
-app = Flask(__name__)
-CORS(app)
+from response_cache import ResponseCache
 
-# Database configuration
 basedir = os.path.abspath(os.path.dirname(__file__))
-app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL') or \
-    'sqlite:///' + os.path.join(basedir, 'data', 'products.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
-db = SQLAlchemy(app)
+# Rows per transaction for bulk import and per query page for export
+BULK_BATCH_SIZE = int(os.environ.get('BULK_BATCH_SIZE') or 1000)
+
+# Precomputed rankings: list length kept per category, weight of the
+# Bayesian rating prior (in ratings) and half-life of trending order volume
+TOP_PRODUCTS_SIZE = int(os.environ.get('TOP_PRODUCTS_SIZE') or 50)
+RATING_PRIOR_COUNT = float(os.environ.get('RATING_PRIOR_COUNT') or 50)
+TRENDING_HALF_LIFE_HOURS = float(os.environ.get('TRENDING_HALF_LIFE_HOURS') or 72)
+RANKING_KINDS = ('rated', 'discount', 'trending')
+
+# Extensions are bound to an app in create_app(); nothing touches the
+# database at import time, so gunicorn workers start without I/O.
+db = SQLAlchemy()
+bp = Blueprint('products', __name__)
+cache = ResponseCache()
 
 # Models
 class Product(db.Model):
@@ -45,10 +64,24 @@ class Product(db.Model):
             'stock': self.stock
         }
 
-# Initialize database
-with app.app_context():
+class ProductSales(db.Model):
+    product_id = db.Column(db.String(50), primary_key=True)
+    units = db.Column(db.Integer, default=0)
+    # log of exponentially decayed units, see record_sales()
+    trend_score = db.Column(db.Float, nullable=False, index=True)
+
+class ProductRanking(db.Model):
+    # Materialized top-N list per (category, kind); category '' is the whole catalog
+    category = db.Column(db.String(100), primary_key=True)
+    kind = db.Column(db.String(20), primary_key=True)
+    position = db.Column(db.Integer, primary_key=True)
+    product_id = db.Column(db.String(50), nullable=False)
+    score = db.Column(db.Float, nullable=False)
+
+# Database setup (run once per release via `flask --app app init-db`)
+def init_db():
     db.create_all()
-    
+
     # Add sample data if no products exist
     if Product.query.count() == 0:
         sample_products = [
@@ -90,17 +123,298 @@ with app.app_context():
                    image="accessories-2.jpg", rating=4.6, rating_count=310, discount=38, category="Accessories",
                    description="Minimal analog watch with a leather strap.", stock=25),
         ]
-        
+
         for product in sample_products:
             db.session.add(product)
         db.session.commit()
 
+    refresh_rankings()
+
+# Rankings
+def _ranking_score(kind):
+    if kind == 'rated':
+        # Bayesian average: pull products with few ratings towards the catalog mean
+        count = db.func.coalesce(Product.rating_count, 0)
+        mean = db.session.query(
+            db.func.sum(Product.rating * Product.rating_count) / db.func.nullif(db.func.sum(Product.rating_count), 0)
+        ).scalar() or 0.0
+        return (RATING_PRIOR_COUNT * mean + db.func.coalesce(Product.rating, 0) * count) / (RATING_PRIOR_COUNT + count)
+    if kind == 'discount':
+        return db.func.coalesce(Product.discount, 0)
+    return ProductSales.trend_score
+
+def _lock_ranking(key, kind):
+    # Serialize rebuilds of one list across workers and pods so concurrent
+    # delete + insert cannot collide on (category, kind, position). Locks are
+    # always taken in the same order, see refresh_rankings(). SQLite already
+    # serializes writers.
+    if db.engine.dialect.name == 'postgresql':
+        lock_id = zlib.crc32(f'product-ranking:{kind}:{key}'.encode('utf-8'))
+        db.session.execute(db.text('SELECT pg_advisory_xact_lock(:lock_id)'), {'lock_id': lock_id})
+
+def refresh_rankings(categories=None, kinds=RANKING_KINDS):
+    """Recompute the top lists for the given categories (all if None) plus the catalog-wide list."""
+    if categories is None:
+        # Lists of categories that no longer exist are rebuilt empty, under
+        # their lock like any other, rather than bulk-deleted up front
+        categories = [category for (category,) in db.session.query(Product.category).distinct()]
+        categories += [category for (category,) in db.session.query(ProductRanking.category)
+                       .filter(ProductRanking.kind.in_(kinds)).distinct()]
+    keys = sorted({category.lower() for category in categories} | {''})
+    for kind in sorted(kinds, key=RANKING_KINDS.index):
+        score = _ranking_score(kind)
+        for key in keys:
+            _lock_ranking(key, kind)
+            query = db.session.query(Product.id, score)
+            if kind == 'trending':
+                query = query.join(ProductSales, ProductSales.product_id == Product.id)
+            if key:
+                query = query.filter(db.func.lower(Product.category) == key)
+            rows = query.order_by(score.desc(), Product.id).limit(TOP_PRODUCTS_SIZE).all()
+            ProductRanking.query.filter_by(category=key, kind=kind).delete(synchronize_session=False)
+            if rows:
+                db.session.execute(ProductRanking.__table__.insert(), [
+                    {'category': key, 'kind': kind, 'position': position,
+                     'product_id': product_id, 'score': float(value or 0)}
+                    for position, (product_id, value) in enumerate(rows)
+                ])
+    db.session.commit()
+
+def parse_sales_items(items):
+    """Validate a sales feed and return (product_id, quantity) pairs."""
+    if not isinstance(items, list):
+        raise ValueError('items must be a list')
+    parsed = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or item.get('productId') in (None, ''):
+            raise ValueError(f'items[{index}] needs a productId')
+        quantity = item.get('quantity')
+        if isinstance(quantity, bool) or not isinstance(quantity, int) or quantity <= 0:
+            raise ValueError(f'items[{index}].quantity must be a positive integer')
+        parsed.append((str(item['productId']), quantity))
+    return parsed
+
+def decayed_score(previous, quantity, now):
+    """Add quantity units sold at `now` to a log-space decayed score."""
+    # Scores are stored as log(sum(units * e^(t / tau))) so that older sales
+    # decay relative to newer ones without ever rewriting old rows.
+    tau = TRENDING_HALF_LIFE_HOURS * 3600 / math.log(2)
+    increment = math.log(quantity) + now / tau
+    if previous is None:
+        return increment
+    high, low = max(previous, increment), min(previous, increment)
+    return high + math.log1p(math.exp(low - high))
+
+def record_sales(items, now=None):
+    """Add validated (product_id, quantity) pairs to each product's trend score.
+
+    Trending lists are rebuilt by the periodic refresh-rankings job rather
+    than per order, so bursts of orders coalesce into one refresh.
+    """
+    now = time.time() if now is None else now
+    recorded = 0
+    # Sorted so concurrent feeds lock products in the same order
+    for product_id, quantity in sorted(items):
+        # Locking the product row serializes the read-modify-write below,
+        # including the first insert of its ProductSales row
+        product = db.session.get(Product, product_id, with_for_update=True)
+        if not product:
+            continue
+        sales = db.session.get(ProductSales, product_id)
+        if sales:
+            sales.trend_score = decayed_score(sales.trend_score, quantity, now)
+            sales.units += quantity
+        else:
+            db.session.add(ProductSales(product_id=product_id, units=quantity,
+                                        trend_score=decayed_score(None, quantity, now)))
+        recorded += 1
+    db.session.commit()
+    return recorded
+
+# Bulk import/export
+# Wire name, column, converter. Same camelCase keys as Product.to_dict(),
+# so an export can be fed straight back into an import.
+def _optional(convert, default=None):
+    # Only a missing value or an empty CSV cell counts as empty
+    return lambda value: default if value in (None, '') else convert(value)
+
+def _amount(value):
+    # float() also accepts 'nan' and 'inf', which would poison the rankings
+    if isinstance(value, bool):
+        raise ValueError('expected a number')
+    number = float(value)
+    if not math.isfinite(number) or number < 0:
+        raise ValueError('expected a finite, non-negative number')
+    return number
+
+def _whole(value):
+    # int() would silently truncate 2.5, so only accept integral values
+    number = _amount(value)
+    if not number.is_integer():
+        raise ValueError('expected a whole number')
+    return int(number)
+
+def _text(value):
+    if isinstance(value, (dict, list)):
+        raise ValueError('expected a string')
+    return str(value)
+
+BULK_FIELDS = [
+    ('id', 'id', _text),
+    ('name', 'name', _text),
+    ('brand', 'brand', _text),
+    ('price', 'price', _amount),
+    ('originalPrice', 'original_price', _optional(_amount)),
+    ('image', 'image', _optional(_text)),
+    ('rating', 'rating', _optional(_amount, 0.0)),
+    ('ratingCount', 'rating_count', _optional(_whole, 0)),
+    ('discount', 'discount', _optional(_whole)),
+    ('category', 'category', _text),
+    ('description', 'description', _optional(_text)),
+    ('stock', 'stock', _optional(_whole, 0)),
+]
+BULK_REQUIRED = ('id', 'name', 'brand', 'price', 'category')
+
+def parse_product_row(record):
+    """Validate one import record and return a column dict for Product."""
+    if not isinstance(record, dict):
+        raise ValueError('row must be an object')
+    for field in BULK_REQUIRED:
+        if record.get(field) in (None, ''):
+            raise ValueError(f'{field} is required')
+    row = {}
+    for key, column, convert in BULK_FIELDS:
+        try:
+            row[column] = convert(record.get(key))
+        except (TypeError, ValueError):
+            raise ValueError(f'invalid {key}: {record.get(key)!r}')
+    return row
+
+def _iter_records(text, fmt):
+    """Yield (line_number, record_or_error) from an NDJSON or CSV text stream."""
+    if fmt == 'csv':
+        reader = csv.DictReader(text)
+        for record in reader:
+            yield reader.line_num, record
+        return
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as e:
+            yield line_number, ValueError(f'invalid JSON: {e}')
+
+def _upsert_batch(batch, categories):
+    # Later rows win within a batch; delete + bulk insert is one statement
+    # each regardless of batch size and works on every backend.
+    rows = list({row['id']: row for row in batch}.values())
+    ids = [row['id'] for row in rows]
+    # Old and new categories both need their rankings refreshed
+    categories.update(category for (category,) in db.session.query(Product.category).filter(Product.id.in_(ids)).distinct())
+    categories.update(row['category'] for row in rows)
+    try:
+        Product.query.filter(Product.id.in_(ids)).delete(synchronize_session=False)
+        db.session.execute(Product.__table__.insert(), rows)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return len(rows)
+
+def import_products(text, fmt='ndjson', max_errors=100):
+    """Stream records from text, validating and upserting BULK_BATCH_SIZE rows per transaction.
+
+    A failing batch stops the import; batches committed before it stay and
+    are counted in 'imported', and the failure is reported under 'error'.
+    A failed rankings refresh is reported the same way. Cached catalog
+    responses are invalidated whenever anything was committed, so CLI
+    imports are visible without waiting for the cache to expire.
+    """
+    result = {'imported': 0, 'rejected': 0, 'errors': []}
+    batch, categories = [], set()
+    try:
+        for line_number, record in _iter_records(text, fmt):
+            try:
+                if isinstance(record, Exception):
+                    raise record
+                batch.append(parse_product_row(record))
+            except ValueError as e:
+                result['rejected'] += 1
+                if len(result['errors']) < max_errors:
+                    result['errors'].append({'line': line_number, 'error': str(e)})
+                continue
+            if len(batch) >= BULK_BATCH_SIZE:
+                result['imported'] += _upsert_batch(batch, categories)
+                batch = []
+        if batch:
+            result['imported'] += _upsert_batch(batch, categories)
+    except Exception as e:
+        result['error'] = str(e)
+    # Rankings cover every committed batch, including after a failure
+    if categories:
+        try:
+            refresh_rankings(categories)
+        except Exception as e:
+            db.session.rollback()
+            result.setdefault('error', f'rankings refresh failed: {e}')
+    if result['imported']:
+        cache.invalidate('catalog')
+    return result
+
+def export_products(fmt='ndjson'):
+    """Yield the catalog as NDJSON or CSV text, one keyset page at a time."""
+    table = Product.__table__
+    keys = [key for key, _, _ in BULK_FIELDS]
+    if fmt == 'csv':
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(keys)
+    last_id = None
+    while True:
+        query = db.select(table).order_by(table.c.id).limit(BULK_BATCH_SIZE)
+        if last_id is not None:
+            query = query.where(table.c.id > last_id)
+        rows = db.session.execute(query).mappings().all()
+        if not rows:
+            break
+        for row in rows:
+            values = [row[column] for _, column, _ in BULK_FIELDS]
+            if fmt == 'csv':
+                writer.writerow(values)
+            else:
+                yield json.dumps(dict(zip(keys, values))) + '\n'
+        if fmt == 'csv':
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        last_id = rows[-1]['id']
+    if fmt == 'csv' and buffer.tell():
+        yield buffer.getvalue()
+
+def admin_required(view):
+    """Reject requests without the X-Admin-Token header matching ADMIN_API_TOKEN."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        expected = current_app.config.get('ADMIN_API_TOKEN')
+        token = request.headers.get('X-Admin-Token', '')
+        if not expected or not hmac.compare_digest(token, expected):
+            return jsonify({'error': 'Unauthorized'}), 401
+        return view(*args, **kwargs)
+    return wrapper
+
+def _bulk_format(value):
+    fmt = (value or 'ndjson').lower()
+    if fmt not in ('ndjson', 'csv'):
+        raise ValueError('format must be ndjson or csv')
+    return fmt
+
 # Routes
-@app.route('/health', methods=['GET'])
+@bp.route('/health', methods=['GET'])
 def health():
     return jsonify({'status': 'healthy', 'service': 'product-service'})
 
-@app.route('/products', methods=['GET'])
+@bp.route('/products', methods=['GET'])
 def get_products():
     try:
         category = request.args.get('category')
@@ -126,7 +440,8 @@ def get_products():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/products/<product_id>', methods=['GET'])
+@bp.route('/products/<product_id>', methods=['GET'])
+@cache.cached(max_age=60, stale_while_revalidate=300, tag='catalog')
 def get_product(product_id):
     try:
         product = Product.query.get(product_id)
@@ -139,7 +454,8 @@ def get_product(product_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/categories', methods=['GET'])
+@bp.route('/categories', methods=['GET'])
+@cache.cached(max_age=300, stale_while_revalidate=3600, tag='catalog')
 def get_categories():
     try:
         categories = db.session.query(Product.category).distinct().all()
@@ -147,7 +463,7 @@ def get_categories():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/products/category/<category>', methods=['GET'])
+@bp.route('/products/category/<category>', methods=['GET'])
 def get_products_by_category(category):
     try:
         products = Product.query.filter(Product.category.ilike(f'%{category}%')).all()
@@ -161,5 +477,133 @@ def get_products_by_category(category):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@bp.route('/products/top', methods=['GET'])
+@cache.cached(max_age=30, stale_while_revalidate=300, tag='catalog')
+def get_top_products():
+    try:
+        kind = request.args.get('by', 'rated')
+        if kind not in RANKING_KINDS:
+            return jsonify({'error': f"by must be one of {', '.join(RANKING_KINDS)}"}), 400
+        limit = max(1, min(request.args.get('limit', 10, type=int), TOP_PRODUCTS_SIZE))
+        key = (request.args.get('category') or '').lower()
+
+        # Served straight from the precomputed list: cost is O(limit), not O(catalog)
+        rows = db.session.query(Product, ProductRanking.score) \
+            .join(ProductRanking, ProductRanking.product_id == Product.id) \
+            .filter(ProductRanking.category == key, ProductRanking.kind == kind) \
+            .order_by(ProductRanking.position) \
+            .limit(limit).all()
+        result = []
+        for product, score in rows:
+            p = product.to_dict()
+            if p.get('image'):
+                p['image'] = f"/assets/{p['image']}"
+            p['score'] = score
+            result.append(p)
+        return jsonify(result)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/products/sales', methods=['POST'])
+@admin_required
+def post_product_sales():
+    try:
+        data = request.get_json(silent=True)
+
+        if not isinstance(data, dict) or 'items' not in data:
+            return jsonify({'error': 'items is required'}), 400
+        try:
+            items = parse_sales_items(data['items'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+
+        return jsonify({'recorded': record_sales(items)})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/products/import', methods=['POST'])
+@admin_required
+def bulk_import_products():
+    try:
+        content_type = request.mimetype or ''
+        fmt = _bulk_format(request.args.get('format') or ('csv' if 'csv' in content_type else 'ndjson'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        # Read the body as a stream so memory stays bounded by the batch size
+        text = io.TextIOWrapper(io.BufferedReader(request.stream), encoding='utf-8', newline='')
+        result = import_products(text, fmt)
+        return jsonify(result), 500 if 'error' in result else 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@bp.route('/products/export', methods=['GET'])
+def bulk_export_products():
+    try:
+        fmt = _bulk_format(request.args.get('format'))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    return Response(stream_with_context(export_products(fmt)), mimetype=mimetype)
+
+def create_app():
+    app = Flask(__name__)
+    CORS(app)
+
+    # Database configuration
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL') or \
+        'sqlite:///' + os.path.join(basedir, 'data', 'products.db')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SERVICE_NAME'] = os.environ.get('SERVICE_NAME') or 'product-service'
+
+    # Bulk write endpoints are disabled unless a token is configured
+    app.config['ADMIN_API_TOKEN'] = os.environ.get('ADMIN_API_TOKEN')
+
+    db.init_app(app)
+    cache.init_app(app)
+    app.register_blueprint(bp)
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create tables and seed sample products."""
+        init_db()
+
+    @app.cli.command('refresh-rankings')
+    @click.option('--kind', 'kinds', type=click.Choice(RANKING_KINDS), multiple=True,
+                  help='Only rebuild these rankings (default: all).')
+    def refresh_rankings_command(kinds):
+        """Rebuild precomputed top-products lists for every category."""
+        refresh_rankings(kinds=kinds or RANKING_KINDS)
+
+    @app.cli.command('import-products')
+    @click.argument('source', type=click.File('r', encoding='utf-8'), default='-')
+    @click.option('--format', 'fmt', type=click.Choice(['ndjson', 'csv']), default=None,
+                  help='Input format (default: from file extension, else ndjson).')
+    def import_products_command(source, fmt):
+        """Upsert products from an NDJSON or CSV file (or stdin)."""
+        fmt = fmt or ('csv' if source.name.endswith('.csv') else 'ndjson')
+        result = import_products(source, fmt)
+        for error in result['errors']:
+            click.echo(f"line {error['line']}: {error['error']}", err=True)
+        click.echo(f"Imported {result['imported']} products, rejected {result['rejected']}")
+        if 'error' in result:
+            raise click.ClickException(f"Import stopped: {result['error']}")
+
+    @app.cli.command('export-products')
+    @click.argument('target', type=click.File('w', encoding='utf-8'), default='-')
+    @click.option('--format', 'fmt', type=click.Choice(['ndjson', 'csv']), default='ndjson')
+    def export_products_command(target, fmt):
+        """Stream the catalog to an NDJSON or CSV file (or stdout)."""
+        for chunk in export_products(fmt):
+            target.write(chunk)
+
+    return app
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5001, debug=True)
\ No newline at end of file
+    app = create_app()
+    # Schema setup is a separate step: `python app.py init-db` runs only that
+    if sys.argv[1:] == ['init-db']:
+        with app.app_context():
+            init_db()
+    else:
+        app.run(host='0.0.0.0', port=5001, debug=True)
\ No newline at end of file
@@ -0,0 +1,33 @@
+import os
+import sys
+
+import pytest
+
+SERVICE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, SERVICE_DIR)
+sys.path.insert(0, os.path.join(os.path.dirname(SERVICE_DIR), 'common'))
+
+import app as product_app
+
+ADMIN_TOKEN = 'test-admin-token'
+
+@pytest.fixture
+def app(tmp_path, monkeypatch):
+    monkeypatch.setenv('DATABASE_URL', 'sqlite:///' + str(tmp_path / 'products.db'))
+    monkeypatch.setenv('ADMIN_API_TOKEN', ADMIN_TOKEN)
+    monkeypatch.delenv('REDIS_HOST', raising=False)
+    # Exercise the routes' own cache windows; the memory-tier cap has its own test
+    monkeypatch.setenv('RESPONSE_CACHE_MEMORY_MAX_AGE', '86400')
+    app = product_app.create_app()
+    app.config['TESTING'] = True
+    with app.app_context():
+        product_app.init_db()
+    yield app
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+@pytest.fixture
+def admin_headers():
+    return {'X-Admin-Token': ADMIN_TOKEN}
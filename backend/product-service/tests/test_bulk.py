@@ -0,0 +1,121 @@
+import json
+
+import pytest
+
+import app as product_app
+
+def ndjson(*records):
+    return '\n'.join(json.dumps(record) for record in records) + '\n'
+
+def product(**overrides):
+    record = {'id': 'x-1', 'name': 'Tee', 'brand': 'Acme', 'price': 499, 'category': 'Men'}
+    record.update(overrides)
+    return record
+
+def test_parse_product_row_applies_defaults():
+    row = product_app.parse_product_row(product())
+    assert row['rating'] == 0.0
+    assert row['rating_count'] == 0
+    assert row['stock'] == 0
+    assert row['original_price'] is None
+
+def test_parse_product_row_treats_empty_csv_cells_as_missing():
+    row = product_app.parse_product_row(product(price='10', rating='', ratingCount='', discount=''))
+    assert row['price'] == 10.0
+    assert row['rating'] == 0.0
+    assert row['discount'] is None
+
+@pytest.mark.parametrize('record, message', [
+    (product(name=''), 'name is required'),
+    (product(price='cheap'), 'invalid price'),
+    (product(rating={}), 'invalid rating'),
+    (product(ratingCount=[]), 'invalid ratingCount'),
+    (product(brand={'a': 1}), 'invalid brand'),
+    (product(price='nan'), 'invalid price'),
+    (product(price=float('inf')), 'invalid price'),
+    (product(price=-1), 'invalid price'),
+    (product(originalPrice='-inf'), 'invalid originalPrice'),
+    (product(rating=-0.5), 'invalid rating'),
+    (product(stock=-3), 'invalid stock'),
+    (product(stock=2.5), 'invalid stock'),
+    (product(ratingCount='1.5'), 'invalid ratingCount'),
+    (product(discount=True), 'invalid discount'),
+    ('not an object', 'row must be an object'),
+])
+def test_parse_product_row_rejects_bad_values(record, message):
+    with pytest.raises(ValueError, match=message):
+        product_app.parse_product_row(record)
+
+def test_import_requires_admin_token(client):
+    response = client.post('/products/import', data=ndjson(product()), content_type='application/x-ndjson')
+    assert response.status_code == 401
+
+def test_import_upserts_and_reports_rejected_lines(client, admin_headers):
+    body = ndjson(product(), product(id='m-1', name='Renamed')) + 'not json\n' + ndjson(product(id='x-2', price=None))
+    response = client.post('/products/import', data=body, content_type='application/x-ndjson',
+                           headers=admin_headers)
+    assert response.status_code == 200
+    assert response.json['imported'] == 2
+    assert response.json['rejected'] == 2
+    assert [error['line'] for error in response.json['errors']] == [3, 4]
+    assert client.get('/products/m-1').json['name'] == 'Renamed'
+    assert client.get('/products/x-1').json['brand'] == 'Acme'
+
+def test_import_accepts_csv(client, admin_headers):
+    body = 'id,name,brand,price,category,stock\nc-1,Cap,Acme,199,Accessories,\n'
+    response = client.post('/products/import', data=body, content_type='text/csv', headers=admin_headers)
+    assert response.json == {'imported': 1, 'rejected': 0, 'errors': []}
+    assert client.get('/products/c-1').json['stock'] == 0
+
+def test_import_reports_committed_batches_when_a_batch_fails(app, monkeypatch):
+    monkeypatch.setattr(product_app, 'BULK_BATCH_SIZE', 1)
+    upsert = product_app._upsert_batch
+    calls = []
+
+    def failing_upsert(batch, categories):
+        calls.append(batch)
+        if len(calls) == 2:
+            raise RuntimeError('database went away')
+        return upsert(batch, categories)
+
+    monkeypatch.setattr(product_app, '_upsert_batch', failing_upsert)
+    with app.app_context():
+        result = product_app.import_products(iter(ndjson(product(), product(id='x-2'), product(id='x-3')).splitlines()))
+        assert result['imported'] == 1
+        assert result['error'] == 'database went away'
+        assert product_app.db.session.get(product_app.Product, 'x-1') is not None
+
+def test_parse_product_row_accepts_integral_floats_for_integer_columns():
+    row = product_app.parse_product_row(product(stock=4.0, ratingCount='12'))
+    assert row['stock'] == 4 and isinstance(row['stock'], int)
+    assert row['rating_count'] == 12
+
+def test_import_reports_failed_rankings_refresh(app, monkeypatch):
+    def failing_refresh(categories=None, kinds=product_app.RANKING_KINDS):
+        raise RuntimeError('lock timeout')
+
+    monkeypatch.setattr(product_app, 'refresh_rankings', failing_refresh)
+    with app.app_context():
+        result = product_app.import_products(iter(ndjson(product()).splitlines()))
+        assert result['imported'] == 1
+        assert result['error'] == 'rankings refresh failed: lock timeout'
+
+def test_import_invalidates_cached_catalog_outside_requests(app, client):
+    assert 'Hats' not in client.get('/categories').json
+    with app.app_context():
+        product_app.import_products(iter(ndjson(product(category='Hats')).splitlines()))
+    assert 'Hats' in client.get('/categories').json
+
+def test_export_round_trips_through_import(app, client, admin_headers):
+    exported = client.get('/products/export').get_data(as_text=True)
+    lines = exported.splitlines()
+    assert len(lines) == 10
+    assert json.loads(lines[0])['id'] == 'a-1'
+
+    response = client.post('/products/import', data=exported, content_type='application/x-ndjson',
+                           headers=admin_headers)
+    assert response.json['imported'] == 10
+
+    csv_lines = client.get('/products/export?format=csv').get_data(as_text=True).splitlines()
+    assert csv_lines[0].startswith('id,name,brand,price')
+    assert len(csv_lines) == 11
@@ -0,0 +1,139 @@
+import json
+
+import app as product_app
+
+def age_entries(app, seconds):
+    backend = app.extensions['response_cache']['backend']
+    for entry in backend.entries.values():
+        entry['stored_at'] -= seconds
+
+def finish_refreshes(app):
+    state = app.extensions['response_cache']
+    if state['executor'] is not None:
+        state['executor'].shutdown(wait=True)
+        state['executor'] = None
+
+def add_category(app, category):
+    with app.app_context():
+        product_app.db.session.add(product_app.Product(id='z-1', name='Z', brand='B', price=1, category=category))
+        product_app.db.session.commit()
+
+def test_miss_then_hit_with_cache_headers(client):
+    first = client.get('/categories')
+    assert first.headers['X-Cache'] == 'MISS'
+    assert first.headers['Cache-Control'] == 'public, max-age=300, stale-while-revalidate=3600'
+    assert 'Accept-Encoding' in first.headers['Vary']
+
+    second = client.get('/categories')
+    assert second.headers['X-Cache'] == 'HIT'
+    assert second.json == first.json
+
+def test_stale_entry_is_served_then_refreshed_in_background(app, client):
+    client.get('/categories')
+    add_category(app, 'Zed')
+    age_entries(app, 301)
+
+    stale = client.get('/categories')
+    assert stale.headers['X-Cache'] == 'STALE'
+    assert 'Zed' not in stale.json
+
+    finish_refreshes(app)
+    refreshed = client.get('/categories')
+    assert refreshed.headers['X-Cache'] == 'HIT'
+    assert 'Zed' in refreshed.json
+
+def test_expired_entry_is_recomputed_inline(app, client):
+    client.get('/categories')
+    add_category(app, 'Zed')
+    age_entries(app, 300 + 3600 + 1)
+
+    response = client.get('/categories')
+    assert response.headers['X-Cache'] == 'MISS'
+    assert 'Zed' in response.json
+
+def test_errors_are_not_cached(client):
+    assert client.get('/products/nope').status_code == 404
+    assert 'X-Cache' not in client.get('/products/nope').headers
+
+def test_import_invalidates_catalog_responses(client, admin_headers):
+    client.get('/products/m-1')
+    body = json.dumps({'id': 'm-1', 'name': 'Renamed', 'brand': 'B', 'price': 1, 'category': 'Men'})
+    client.post('/products/import', data=body, content_type='application/x-ndjson', headers=admin_headers)
+
+    response = client.get('/products/m-1')
+    assert response.headers['X-Cache'] == 'MISS'
+    assert response.json['name'] == 'Renamed'
+
+def test_refresh_started_before_invalidation_is_dropped(app, client):
+    client.get('/categories')
+    age_entries(app, 301)
+    state = app.extensions['response_cache']
+    view = app.view_functions['products.get_categories'].__wrapped__
+    key = next(iter(state['backend'].entries))
+
+    with app.test_request_context('/categories'):
+        product_app.cache.invalidate('catalog')
+    product_app.cache._refresh(app, state, key, 'catalog', 0, {'max_age': 300, 'stale_while_revalidate': 3600},
+                               view, (), {}, '/categories', b'', {})
+    assert ('get_categories', 'refresh') not in state['counters']
+
+def test_metrics_export_counters_and_evictions(app, client):
+    client.get('/categories')
+    client.get('/categories')
+    metrics = client.get('/metrics').get_data(as_text=True)
+    assert 'response_cache_requests_total{service="product-service",endpoint="get_categories",outcome="hit"} 1' in metrics
+    assert 'response_cache_evictions_total{service="product-service",scope="process"} 0' in metrics
+
+class FakeRedis:
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+        self.data = {}
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value.encode('utf-8') if isinstance(value, str) else value
+
+    def incr(self, key):
+        self.data[key] = str(int(self.data.get(key) or 0) + 1).encode('utf-8')
+
+    def info(self, section):
+        return {'evicted_keys': 0}
+
+    def dbsize(self):
+        return len(self.data)
+
+def test_redis_backend_authenticates_and_treats_corrupt_entries_as_misses(tmp_path, monkeypatch):
+    import redis
+    monkeypatch.setattr(redis, 'Redis', FakeRedis)
+    monkeypatch.setenv('DATABASE_URL', 'sqlite:///' + str(tmp_path / 'products.db'))
+    monkeypatch.setenv('REDIS_HOST', 'redis-service')
+    monkeypatch.setenv('REDIS_PASSWORD', 's3cret')
+    app = product_app.create_app()
+    with app.app_context():
+        product_app.init_db()
+    client = app.test_client()
+
+    fake = app.extensions['response_cache']['backend'].client
+    assert fake.kwargs['host'] == 'redis-service'
+    assert fake.kwargs['password'] == 's3cret'
+
+    assert client.get('/categories').headers['X-Cache'] == 'MISS'
+    assert client.get('/categories').headers['X-Cache'] == 'HIT'
+
+    for key in fake.data:
+        if '/categories' in key:
+            fake.data[key] = b'not json'
+    response = client.get('/categories')
+    assert response.status_code == 200
+    assert response.headers['X-Cache'] == 'MISS'
+
+def test_memory_tier_caps_entry_lifetime(app, client):
+    app.extensions['response_cache']['max_lifetime'] = 5
+    client.get('/categories')
+    age_entries(app, 6)
+    assert client.get('/categories').headers['X-Cache'] == 'STALE'
+    finish_refreshes(app)
+    age_entries(app, 11)
+    assert client.get('/categories').headers['X-Cache'] == 'MISS'
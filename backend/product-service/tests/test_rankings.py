@@ -0,0 +1,88 @@
+import json
+import math
+
+import pytest
+
+import app as product_app
+
+def top(client, **params):
+    response = client.get('/products/top', query_string=params)
+    assert response.status_code == 200
+    return [product['id'] for product in response.json]
+
+def test_top_rated_uses_bayesian_average(client):
+    # a-2 (4.6 from 310 ratings) outranks w-1 (4.6 from 221) and k-3 (4.5 from 122)
+    assert top(client, by='rated', limit=3) == ['a-2', 'w-1', 'k-3']
+
+def test_bayesian_average_discounts_products_with_few_ratings(app, client, admin_headers):
+    body = json.dumps({'id': 'n-1', 'name': 'New', 'brand': 'B', 'price': 1, 'category': 'Men',
+                       'rating': 5.0, 'ratingCount': 1})
+    client.post('/products/import', data=body, content_type='application/x-ndjson', headers=admin_headers)
+    # A single 5-star rating does not beat 4.4 stars from 198 ratings
+    assert top(client, by='rated', category='men')[0] == 'm-3'
+
+def test_rated_ranking_without_any_ratings(app, client):
+    with app.app_context():
+        product_app.Product.query.update({'rating_count': 0})
+        product_app.db.session.commit()
+        product_app.refresh_rankings()
+    response = client.get('/products/top?by=rated&limit=50')
+    assert len(response.json) == 10
+    assert {product['score'] for product in response.json} == {0.0}
+
+def test_full_refresh_empties_lists_of_removed_categories(app, client):
+    with app.app_context():
+        product_app.Product.query.filter(product_app.Product.category == 'Men').delete()
+        product_app.db.session.commit()
+        product_app.refresh_rankings()
+        assert product_app.ProductRanking.query.filter_by(category='men').count() == 0
+    assert top(client, by='discount', category='men') == []
+    assert len(top(client, by='rated', limit=50)) == 7
+
+def test_top_discount_per_category(client):
+    assert top(client, by='discount', limit=2) == ['m-1', 'a-1']
+    assert top(client, by='discount', category='MEN') == ['m-1', 'm-3', 'm-2']
+
+def test_limit_is_clamped(client):
+    assert len(top(client, by='rated', limit=-1)) == 1
+    assert len(top(client, by='rated', limit=500)) == 10
+
+def test_unknown_ranking_is_rejected(client):
+    assert client.get('/products/top?by=newest').status_code == 400
+
+def test_decayed_score_halves_after_half_life():
+    half_life = product_app.TRENDING_HALF_LIFE_HOURS * 3600
+    now = 1_700_000_000
+    old = product_app.decayed_score(None, 4, now)
+    # 4 units one half-life ago weigh the same as 2 units now
+    assert product_app.decayed_score(None, 4, now - half_life) == pytest.approx(product_app.decayed_score(None, 2, now))
+    combined = product_app.decayed_score(old, 4, now)
+    assert combined == pytest.approx(old + math.log(2))
+
+def test_sales_feed_ranks_trending_after_refresh(app, client, admin_headers):
+    feed = {'items': [{'productId': 'k-1', 'quantity': 3}, {'productId': 'm-2', 'quantity': 1},
+                      {'productId': 'missing', 'quantity': 5}]}
+    response = client.post('/products/sales', json=feed, headers=admin_headers)
+    assert response.json == {'recorded': 2}
+    # Trending lists are rebuilt by the periodic refresh, not per order
+    assert top(client, by='trending') == []
+    with app.app_context():
+        product_app.refresh_rankings(kinds=('trending',))
+    assert top(client, by='trending', limit=5) == ['k-1', 'm-2']
+    assert top(client, by='trending', category='Men') == ['m-2']
+
+def test_sales_feed_requires_admin_token(client):
+    response = client.post('/products/sales', json={'items': []})
+    assert response.status_code == 401
+
+@pytest.mark.parametrize('feed', [
+    {'items': ['x']},
+    {'items': [{'productId': 'k-1', 'quantity': 'lots'}]},
+    {'items': [{'productId': 'k-1', 'quantity': 0}]},
+    {'items': [{'quantity': 1}]},
+    {'items': 'k-1'},
+    {},
+])
+def test_sales_feed_rejects_malformed_items(client, admin_headers, feed):
+    response = client.post('/products/sales', json=feed, headers=admin_headers)
+    assert response.status_code == 400
@@ -26,7 +26,7 @@ mkdir -p user-service/data
 mkdir -p cart-service/data
 mkdir -p order-service/data
 
-# Build and start all services
+# Build and start all services (the *-init services create schemas first)
 echo "🔧 Building and starting microservices..."
 docker-compose up --build -d
 
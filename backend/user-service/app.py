@@ -1,25 +1,18 @@
-from flask import Flask, jsonify, request
+from flask import Blueprint, Flask, jsonify, request
 from flask_cors import CORS
 from flask_sqlalchemy import SQLAlchemy
 from flask_jwt_extended import JWTManager, create_access_token, jwt_required, get_jwt_identity
-import bcrypt
 import os
+import sys
 from datetime import timedelta
 
-app = Flask(__name__)
-CORS(app)
-
-# Configuration
-app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY') or 'your-secret-key-change-in-production'
-app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
-
 basedir = os.path.abspath(os.path.dirname(__file__))
-app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL') or \
-    'sqlite:///' + os.path.join(basedir, 'data', 'users.db')
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
-db = SQLAlchemy(app)
-jwt = JWTManager(app)
+# Extensions are bound to an app in create_app(); nothing touches the
+# database at import time, so gunicorn workers start without I/O.
+db = SQLAlchemy()
+jwt = JWTManager()
+bp = Blueprint('users', __name__)
 
 # Models
 class User(db.Model):
@@ -43,16 +36,16 @@ class User(db.Model):
             'createdAt': self.created_at.isoformat() if self.created_at else None
         }
 
-# Initialize database
-with app.app_context():
+# Database setup (run once per release via `flask --app app init-db`)
+def init_db():
     db.create_all()
 
 # Routes
-@app.route('/health', methods=['GET'])
+@bp.route('/health', methods=['GET'])
 def health():
     return jsonify({'status': 'healthy', 'service': 'user-service'})
 
-@app.route('/auth/register', methods=['POST'])
+@bp.route('/auth/register', methods=['POST'])
 def register():
     try:
         data = request.get_json()
@@ -68,7 +61,8 @@ def register():
         if existing_user:
             return jsonify({'error': 'User already exists'}), 409
         
-        # Hash password
+        # Hash password (bcrypt is only needed by the auth routes)
+        import bcrypt
         password_hash = bcrypt.hashpw(data['password'].encode('utf-8'), bcrypt.gensalt())
         
         # Create new user
@@ -96,7 +90,7 @@ def register():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/auth/login', methods=['POST'])
+@bp.route('/auth/login', methods=['POST'])
 def login():
     try:
         data = request.get_json()
@@ -106,6 +100,7 @@ def login():
         
         user = User.query.filter_by(email=data['email']).first()
         
+        import bcrypt
         if not user or not bcrypt.checkpw(data['password'].encode('utf-8'), user.password_hash.encode('utf-8')):
             return jsonify({'error': 'Invalid credentials'}), 401
         
@@ -120,7 +115,7 @@ def login():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/users/profile/<int:user_id>', methods=['GET'])
+@bp.route('/users/profile/<int:user_id>', methods=['GET'])
 @jwt_required()
 def get_profile(user_id):
     try:
@@ -139,7 +134,7 @@ def get_profile(user_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-@app.route('/users/profile/<int:user_id>', methods=['PUT'])
+@bp.route('/users/profile/<int:user_id>', methods=['PUT'])
 @jwt_required()
 def update_profile(user_id):
     try:
@@ -174,5 +169,34 @@ def update_profile(user_id):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+def create_app():
+    app = Flask(__name__)
+    CORS(app)
+
+    # Configuration
+    app.config['JWT_SECRET_KEY'] = os.environ.get('JWT_SECRET_KEY') or 'your-secret-key-change-in-production'
+    app.config['JWT_ACCESS_TOKEN_EXPIRES'] = timedelta(hours=24)
+
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL') or \
+        'sqlite:///' + os.path.join(basedir, 'data', 'users.db')
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+
+    db.init_app(app)
+    jwt.init_app(app)
+    app.register_blueprint(bp)
+
+    @app.cli.command('init-db')
+    def init_db_command():
+        """Create database tables."""
+        init_db()
+
+    return app
+
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=5002, debug=True)
\ No newline at end of file
+    app = create_app()
+    # Schema setup is a separate step: `python app.py init-db` runs only that
+    if sys.argv[1:] == ['init-db']:
+        with app.app_context():
+            init_db()
+    else:
+        app.run(host='0.0.0.0', port=5002, debug=True)
\ No newline at end of file
@@ -180,7 +180,12 @@ deploy_application() {
     
     # Deploy all services using kustomize
     print_status "Deploying all services..."
+    # Jobs are immutable: drop the previous release's migrations so they can be recreated
+    kubectl delete job -l component=migration -n $NAMESPACE --ignore-not-found
     kubectl apply -k kubernetes/
+
+    # Schema setup must finish before the new pods serve traffic
+    kubectl wait --for=condition=complete job -l component=migration -n $NAMESPACE --timeout=300s
     
     # Wait for all services to be ready
     print_status "Waiting for services to be ready..."
@@ -77,7 +77,12 @@ deploy_application() {
     sed -i "s/\${DOCKER_USERNAME}/$DOCKER_USERNAME/g" kubernetes/kustomization.yaml
     
     # Deploy using kustomize
+    # Jobs are immutable: drop the previous release's migrations so they can be recreated
+    kubectl delete job -l component=migration -n $NAMESPACE --ignore-not-found
     kubectl apply -k kubernetes/
+
+    # Schema setup must finish before the new pods serve traffic
+    kubectl wait --for=condition=complete job -l component=migration -n $NAMESPACE --timeout=300s
     
     print_status "Application services deployed successfully"
 }